@@ -12,6 +12,8 @@ def _patch_typing():
     This supplies a minimal-effort stub, since TOMLKit does not use it for
     anything at runtime.
     """
+    if sys.version_info >= (3, 5):  # Always available; skip the import.
+        return
     try:
         import typing  # noqa
     except ImportError:
@@ -24,6 +26,8 @@ def _patch_functools():
     They always use `functools32.lru_cache` on Python 2 (instead of using
     feature detection [sign]). functools32 is not vendorable, so we improvise.
     """
+    if sys.version_info >= (3, 2):
+        return
     try:
         from functools import lru_cache  # noqa
     except ImportError:
@@ -39,6 +43,8 @@ def _patch_enum():
     don't want it to shadow the built-in module (other built-in stuffs break).
     We make it available only when enum is not othereise available.
     """
+    if sys.version_info >= (3, 4):
+        return
     try:
         import enum  # noqa
     except ImportError:
@@ -47,25 +53,14 @@ def _patch_enum():
         sys.modules["enum"] = enum34
 
 
-def _patch_pkg_resources():
-    """jsonschema wants to read its installation record, but we don't have it.
-
-    Patch `pkg_resources.get_distribution()` to return a fake record.
-    """
-    import pkg_resources
-
-    pkg_resources_get_distribution = pkg_resources.get_distribution
-
-    def get_distribution(*args, **kwargs):
-        if args[0] == "jsonschema":
-            return pkg_resources.Distribution(version="")
-        return pkg_resources_get_distribution(*args, **kwargs)
-
-    pkg_resources.get_distribution = get_distribution
+_PATCHED = False
 
 
 def patch():
+    global _PATCHED
+    if _PATCHED:
+        return
     _patch_typing()
     _patch_functools()
     _patch_enum()
-    _patch_pkg_resources()
+    _PATCHED = True
@@ -0,0 +1,11 @@
+try:
+    from functools import lru_cache
+except ImportError:
+    from backports.functools_lru_cache import lru_cache
+
+import packaging.utils
+
+
+# Package names are normalized repeatedly when converting and comparing lock
+# files, mostly the same handful of names. Share one cache across modules.
+canonicalize_name = lru_cache(maxsize=None)(packaging.utils.canonicalize_name)
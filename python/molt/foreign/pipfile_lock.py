@@ -1,8 +1,8 @@
-import collections
 import warnings
 
-from packaging.utils import canonicalize_name
+import six
 
+from molt._utils import canonicalize_name
 from molt.locks import LockFile
 
 
@@ -49,25 +49,22 @@ class VCSPackageNotEditable(PipfileLockWarning):
         self.package_name = name
 
 
-def _parse_vcs_info(package):
-    try:
-        rev = package.ref
-    except AttributeError:
+_VCS_NAMES = ("git", "hg", "bzr", "svn")
+
+
+def _parse_vcs_info(data):
+    if "ref" not in data:
         return None
-    for vcs in ["git", "hg", "bzr", "svn"]:
-        try:
-            url = getattr(package, vcs)
-        except AttributeError:
-            continue
-        else:
-            return vcs, url, rev
+    for vcs in _VCS_NAMES:
+        if vcs in data:
+            return vcs, data[vcs], data["ref"]
     return None
 
 
-def _parse_spec(name, package):
-    editable = getattr(package, "editable", False)
+def _parse_spec(name, data):
+    editable = data.get("editable", False)
 
-    vcs_info = _parse_vcs_info(package)
+    vcs_info = _parse_vcs_info(data)
     if vcs_info is not None:
         # Keep editable VCS (but drop editable flag) because people generally
         # specify it to work around a pip bug and force dependency resolution.
@@ -80,66 +77,61 @@ def _parse_spec(name, package):
     # Other than VCS, people generally specify editable to get its specific
     # behavior. We can't support that yet.
     if editable:
-        raise _EditablePackage(package)
+        raise _EditablePackage(data)
 
-    try:
-        v = package.url
-    except AttributeError:
-        pass
-    else:
-        return {"url": v}
+    if "url" in data:
+        return {"url": data["url"]}
 
-    try:
-        v = package.path
-    except AttributeError:
-        pass
-    else:
-        return {"path": v}
+    if "path" in data:
+        return {"path": data["path"]}
 
     # This is tried last because Pipenv liberally stick versions into other
     # kinds of requirement specifications.
-    try:
-        v = package.version
-    except AttributeError:
-        pass
-    else:
+    if "version" in data:
+        v = data["version"]
         if not v.startswith("=="):
             raise InvalidVersion(v)
         return {"version": v.lstrip("=")}  # Is === possible here?
 
-    raise PackageSpecifierNotSupported(package._data)
+    raise PackageSpecifierNotSupported(data)
+
+
+def _get_package_data(package):
+    # Read the underlying mapping directly instead of going through the
+    # attribute-based accessors. A plain string is shorthand for a version.
+    data = package._data
+    if isinstance(data, six.string_types):
+        return {"version": data}
+    return data
 
 
 def _generate_packages(section):
     for key, package in section.items():
+        data = _get_package_data(package)
         result = {"name": key}
 
         try:
-            spec = _parse_spec(key, package)
+            spec = _parse_spec(key, data)
         except _EditablePackage:
             warnings.warn(EditablePackageDropped(key))
             continue
         result.update(spec)
 
         # TODO: Validate this against the source mapping?
-        try:
-            result["source"] = package.index
-        except AttributeError:
-            pass
+        if "index" in data:
+            result["source"] = data["index"]
 
         yield (
             canonicalize_name(key),
             result,
-            package.get("markers"),
-            package.get("hashes"),
+            data.get("markers"),
+            data.get("hashes"),
         )
 
 
 def _add_dependency(parent, child, marker):
-    curr_marker = parent.get(child)
-    if curr_marker is None:
-        parent[child] = None if marker is None else [marker]
-    elif marker is None:
+    # Most packages in a Pipfile.lock do not have markers.
+    if marker is None:
         parent[child] = None
     else:
         parent[child] = [marker]
@@ -162,23 +154,23 @@ def to_lock_file(pfl):
     if pfl.meta.pipfile_spec not in SUPPORTED_SPECS:
         raise PipfileSpecNotSupported(pfl.meta.pipfile_spec)
 
-    hashes = collections.defaultdict(set)
+    hashes = {}
 
     dependencies = {}
     default = {}
     develop = {}
 
-    for key, result, marker, package_hashes in _generate_packages(pfl.develop):
-        if package_hashes is not None:
-            hashes[key].update(package_hashes)
-        dependencies[key] = {"python": result}
-        _add_dependency(develop, key, marker)
-    for key, result, marker, package_hashes in _generate_packages(pfl.default):
-        if package_hashes is not None:
-            hashes[key].update(package_hashes)
-        # TODO: Merge entries with same keys from default and develop?
-        dependencies[key] = {"python": result}
-        _add_dependency(default, key, marker)
+    # Later entries overwrite earlier ones, so default packages take
+    # precedence over develop ones.
+    # TODO: Merge entries with same keys from default and develop?
+    for section, packages in [(develop, pfl.develop), (default, pfl.default)]:
+        for key, result, marker, package_hashes in _generate_packages(
+            packages
+        ):
+            if package_hashes is not None:
+                hashes.setdefault(key, []).extend(package_hashes)
+            dependencies[key] = {"python": result}
+            _add_dependency(section, key, marker)
 
     dependencies[""] = {"dependencies": default}
     dependencies["[dev]"] = {"dependencies": develop}
@@ -186,20 +178,21 @@ def to_lock_file(pfl):
     data = {
         "sources": dict(_generate_sources(pfl.meta.sources)),
         "dependencies": dependencies,
-        "hashes": {k: sorted(v) for k, v in hashes.items()},
+        "hashes": {k: sorted(set(v)) for k, v in hashes.items()},
     }
 
     return LockFile(data)
 
 
-def _is_package_accounted_for(package_info, section, lock):
+def _is_package_accounted_for(package_info, section, dependencies, hashes):
     key, result, marker, package_hashes = package_info
 
     # Check the package information match.
-    try:
-        package = lock.dependencies[key]["python"].copy()
-    except KeyError:
+    dependency = dependencies.get(key)
+    package = None if dependency is None else dependency.get("python")
+    if package is None:
         return False
+    package = package.copy()
     if canonicalize_name(package.pop("name", None)) != key:
         return False
     result.pop("name", None)
@@ -207,24 +200,24 @@ def _is_package_accounted_for(package_info, section, lock):
         return False
 
     # Check the marker is included.
-    try:
-        dep_markers = lock.dependencies[section]["dependencies"][key]
-    except KeyError:
+    section_dependency = dependencies.get(section)
+    if section_dependency is None:
         return False
-    else:
-        if marker is not None:
-            if marker not in dep_markers:
-                return False
-        elif dep_markers is not None:
+    section_markers = section_dependency.get("dependencies", {})
+    if key not in section_markers:
+        return False
+    dep_markers = section_markers[key]
+    if marker is not None:
+        if marker not in dep_markers:
             return False
+    elif dep_markers is not None:
+        return False
 
     # Check all hashes in Pipfile.lock are included.
     if package_hashes:
-        try:
-            lock_hashes = set(lock.hashes[key])
-        except KeyError:
+        if key not in hashes:
             return False
-        if not (set(package_hashes) <= lock_hashes):
+        if not set(package_hashes).issubset(hashes[key]):
             return False
 
     return True
@@ -234,10 +227,10 @@ def is_accounted_for(pfl, lock):
     """Whether a lock file accounts for all information in given Pipfile.lock.
     """
     # Check all sources in Pipfile.lock are accounted for.
+    sources = lock.sources
     for k, v in _generate_sources(pfl.meta.sources):
-        try:
-            source = lock.sources[k]
-        except KeyError:
+        source = sources.get(k)
+        if source is None:
             return False
         if source["url"] != v["url"]:
             return False
@@ -245,11 +238,13 @@ def is_accounted_for(pfl, lock):
             return False
 
     # Check all packages in Pipfile.lock have equivalents.
-    for info in _generate_packages(pfl.default):
-        if not _is_package_accounted_for(info, "", lock):
-            return False
-    for info in _generate_packages(pfl.develop):
-        if not _is_package_accounted_for(info, "[dev]", lock):
-            return False
+    dependencies = lock.dependencies
+    hashes = lock.hashes
+    for section, packages in [("", pfl.default), ("[dev]", pfl.develop)]:
+        for info in _generate_packages(packages):
+            if not _is_package_accounted_for(
+                info, section, dependencies, hashes
+            ):
+                return False
 
     return True
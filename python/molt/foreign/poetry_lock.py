@@ -1,12 +1,22 @@
-import collections
 import sys
 import warnings
 
-import tomlkit
+import six
+
+# Prefer a plain TOML parser since we never write the document back. TOMLKit
+# (vendored) is only used when neither is available, e.g. on Python 2.
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+        import tomlkit
 
 from packaging.specifiers import SpecifierSet
-from packaging.utils import canonicalize_name
 
+from molt._utils import canonicalize_name
 from molt.locks import LockFile
 
 
@@ -32,6 +42,25 @@ class SourceDropped(UserWarning):
         self.package_name = package_name
 
 
+def _unwrap(value):
+    """Convert a TOMLKit item into plain Python values, recursively.
+
+    TOMLKit wraps everything in style-preserving proxies, which are slow to
+    access. We never write the document back, so drop them right away.
+    """
+    if isinstance(value, dict):
+        return {k: _unwrap(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_unwrap(v) for v in value]
+    if isinstance(value, six.string_types):
+        return six.text_type(value)
+    if isinstance(value, six.integer_types) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    return value
+
+
 def load(f, encoding=None):
     """Parse a poetry.lock file.
 
@@ -43,7 +72,9 @@ def load(f, encoding=None):
         text = text.decode(encoding)
     # Yes, this simply returns a dict. I guess it is enough since we only want
     # to convert it to molt.lock.json anyway?
-    return tomlkit.parse(text)
+    if tomllib is not None:
+        return tomllib.loads(text)
+    return _unwrap(tomlkit.parse(text))
 
 
 def _supports_this_python(requires_python):
@@ -53,10 +84,12 @@ def _supports_this_python(requires_python):
     return ".".join(str(x) for x in sys.version_info[:3]) in spec
 
 
+_VCS_NAMES = frozenset(["git", "hg", "bzr", "svn"])
+
+
 def _parse_spec(package):
-    try:
-        source = package["source"]
-    except KeyError:
+    source = package.get("source")
+    if source is None:
         # A package without source must be named.
         return {"version": package["version"]}
 
@@ -65,30 +98,24 @@ def _parse_spec(package):
         # Poetry seems to only support local file reference, although the key
         # is confusingly named "url".
         return {"path": source["url"]}
-    elif source_type in ["git", "hg", "bzr", "svn"]:
+    elif source_type in _VCS_NAMES:
         return {
             "vcs": "{}+{}".format(source_type, source["url"]),
             "rev": source["reference"],
         }
 
-    try:
-        version = package["version"]
-    except KeyError:
+    if "version" not in package:
         raise PackageSpecifierNotSupported(package)
-    return {"version": version}
-
-
-_Source = collections.namedtuple("_Source", ["name", "url"])
+    return {"version": package["version"]}
 
 
 def _parse_source(package):
-    try:
-        source = package["source"]
-    except KeyError:
-        return None
-    if source["type"] != "legacy":
+    """Return a (name, url) pair for the package's index, or None.
+    """
+    source = package.get("source")
+    if source is None or source["type"] != "legacy":
         return None
-    return _Source(source["reference"], source["url"])
+    return source["reference"], source["url"]
 
 
 def _generate_packages(poetry_lock):
@@ -104,54 +131,51 @@ def _generate_packages(poetry_lock):
             if "version" not in result:
                 warnings.warn(SourceDropped(name))
             else:
-                result["source"] = source.name
+                result["source"] = source[0]
 
         yield (canonicalize_name(name), result, source)
 
 
-def _remove_if_same_section(top_level_packages, dependent, depended_name):
-    try:
-        depended = top_level_packages[depended_name]
-    except KeyError:
-        return
-    # The depended does not need to be a top-level if it's in the same section.
-    # It will be collected when the dependant is traversed.
-    if depended["category"] == dependent["category"]:
-        del top_level_packages[depended_name]
-
-
 def _generate_dependencies(poetry_lock):
-    top_level_packages = {
-        canonicalize_name(p["name"]): p for p in poetry_lock["package"]
-    }
-    packages_markers = {
-        canonicalize_name(p["name"]): p["marker"].replace('"', "'")
-        for p in poetry_lock["package"]
-        if "marker" in p
-    }
-
-    for package_data in poetry_lock["package"]:
+    packages = poetry_lock["package"]
+    package_names = [canonicalize_name(p["name"]) for p in packages]
+
+    packages_by_name = {}
+    packages_markers = {}
+    for key, package_data in zip(package_names, packages):
+        packages_by_name[key] = package_data
+        if "marker" in package_data:
+            marker = package_data["marker"].replace('"', "'")
+            packages_markers[key] = marker
+    get_marker = packages_markers.get
+
+    # Record packages depended on by another package in the same section.
+    # These do not need to be top-level; they are collected when the
+    # dependant is traversed.
+    referenced = set()
+    for package_name, package_data in zip(package_names, packages):
+        category = package_data["category"]
         for dep in package_data.get("dependencies", ()):
             dep = canonicalize_name(dep)
-            _remove_if_same_section(top_level_packages, package_data, dep)
-            package_name = canonicalize_name(package_data["name"])
-            yield package_name, dep, packages_markers.get(dep)
+            depended = packages_by_name.get(dep)
+            if depended is not None and depended["category"] == category:
+                referenced.add(dep)
+            yield package_name, dep, get_marker(dep)
 
     # A package is a top-level dependency if it is not referenced by anyone.
-    for package_data in top_level_packages.values():
-        if package_data.get("optional"):
+    for dep, package_data in packages_by_name.items():
+        if dep in referenced or package_data.get("optional"):
             continue
         if package_data["category"] == "main":
             key = ""
         else:
             key = "[{}]".format(package_data["category"])
-        dep = canonicalize_name(package_data["name"])
-        yield key, dep, packages_markers.get(dep)
+        yield key, dep, get_marker(dep)
 
     for extra_name, extra_pkg_names in poetry_lock.get("extras", {}).items():
         for dep in extra_pkg_names:
             dep = canonicalize_name(dep)
-            yield "[{}]".format(extra_name), dep, packages_markers.get(dep)
+            yield "[{}]".format(extra_name), dep, get_marker(dep)
 
 
 def to_lock_file(poetry_lock):
@@ -161,7 +185,7 @@ def to_lock_file(poetry_lock):
     instance of `molt.locks.LockFile`.
     """
     hashes = {
-        canonicalize_name(k): sorted("sha256:{}".format(h) for h in v)
+        canonicalize_name(k): sorted(["sha256:" + h for h in v])
         for k, v in poetry_lock["metadata"]["hashes"].items()
         if v  # Poetry produces an empty list for non-hash-required packages.
     }
@@ -173,9 +197,10 @@ def to_lock_file(poetry_lock):
     # Generate sources and packages information in depenency entries.
     for key, result, src in _generate_packages(poetry_lock):
         if src is not None:
-            if src.name in sources and sources[src.name]["url"] != src.url:
-                raise SourceNameDuplicated(src.name)
-            sources[src.name] = {"url": src.url}
+            src_name, src_url = src
+            if src_name in sources and sources[src_name]["url"] != src_url:
+                raise SourceNameDuplicated(src_name)
+            sources[src_name] = {"url": src_url}
 
         # If there are no duplicates, good, insert by the package name.
         if key not in aliases:
@@ -220,30 +245,31 @@ def is_accounted_for(poetry_lock, lock):
     """
     new_lock = to_lock_file(poetry_lock)
 
+    # Check all keys are present up front, so the per-entry comparisons
+    # below can index directly.
+    sources = lock.sources
+    dependencies = lock.dependencies
+    hashes = lock.hashes
+    if not (
+        set(new_lock.sources.keys()) <= set(sources.keys())
+        and set(new_lock.dependencies.keys()) <= set(dependencies.keys())
+        and set(new_lock.hashes.keys()) <= set(hashes.keys())
+    ):
+        return False
+
     for key, src in new_lock.sources.items():
-        try:
-            source = lock.sources[key]
-        except KeyError:
-            return False
-        if source.url != src.url:
+        if sources[key]["url"] != src["url"]:
             return False
 
     for key, dep in new_lock.dependencies.items():
-        try:
-            dependency = lock.dependencies[key]
-        except KeyError:
-            return False
+        dependency = dependencies[key]
         if dep.python != dependency.python:
             return False
         if dep.dependencies != dependency.dependencies:
             return False
 
     for key, hs in new_lock.hashes.items():
-        try:
-            hashes = lock.hashes[key]
-        except KeyError:
-            return False
-        if not (set(hs) <= set(hashes)):
+        if not set(hs).issubset(hashes[key]):
             return False
 
     return True
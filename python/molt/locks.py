@@ -1,13 +1,23 @@
-import io
 import json
-import os
+import pkgutil
+
+try:
+    from functools import lru_cache
+except ImportError:
+    from backports.functools_lru_cache import lru_cache
 
 import attr
 import jsonschema
-import packaging.utils
 import plette.models
 import six
 
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+from molt._utils import canonicalize_name
+
 
 class _JSONEncoder(json.JSONEncoder):
     """A specilized JSON encoder to convert loaded data into a lock file.
@@ -24,48 +34,129 @@ class _JSONEncoder(json.JSONEncoder):
         )
 
     def encode(self, obj):
-        content = super(_JSONEncoder, self).encode(obj)
-        if not isinstance(content, six.text_type):
-            content = content.decode("ascii")
-        content += u"\n"
-        return content
+        # The base implementation calls iterencode() with an extra argument,
+        # which our override does not take. Join the chunks ourselves.
+        return u"".join(self.iterencode(obj))
 
     def iterencode(self, obj):
-        for chunk in super(_JSONEncoder, self).iterencode(obj):
-            if not isinstance(chunk, six.text_type):
-                chunk = chunk.decode("ascii")
+        chunks = super(_JSONEncoder, self).iterencode(obj)
+        if six.PY2:  # Only Python 2 can produce byte chunks.
+            chunks = (
+                c if isinstance(c, six.text_type) else c.decode("ascii")
+                for c in chunks
+            )
+        for chunk in chunks:
             yield chunk
         yield u"\n"
 
 
+@lru_cache(maxsize=None)
 def _read_schema():
-    p = os.path.abspath(os.path.join(__file__, "..", "locks.schema.json"))
-    with io.open(p, encoding="utf-8") as f:
-        return json.load(f)
+    """Read and check the lock file schema.
+
+    This is done on first use rather than at import time, so merely importing
+    the module (e.g. on code paths that never touch a lock file) doesn't pay
+    for it.
+    """
+    content = pkgutil.get_data("molt", "locks.schema.json")
+    schema = json.loads(content.decode("utf-8"))
+    jsonschema.validators.validator_for(schema).check_schema(schema)
+    return schema
+
+
+def _select_schemas(schema):
+    properties = schema["properties"]
+    dependency_schema = next(
+        iter(properties["dependencies"]["patternProperties"].values())
+    )
+    source_schema = next(
+        iter(properties["sources"]["patternProperties"].values())
+    )
+    return {
+        "lock": schema,
+        "sources": properties["sources"],
+        "source": source_schema,
+        "dependencies": properties["dependencies"],
+        "dependency": dependency_schema,
+        "python": dependency_schema["properties"]["python"],
+    }
+
+
+class _Validator(object):
+    """Validate data against a schema.
+
+    If fastjsonschema is available, it is used to check the data first. The
+    jsonschema validator only runs when that check fails, to produce the
+    error, so failures are always reported as `jsonschema.ValidationError`.
+    """
+
+    def __init__(self, validator_class, schema):
+        self._validator = validator_class(schema)
+        if fastjsonschema is None:
+            self._fast_validate = None
+        else:
+            self._fast_validate = fastjsonschema.compile(schema)
+
+    def validate(self, data):
+        if self._fast_validate is not None:
+            try:
+                self._fast_validate(data)
+            except fastjsonschema.JsonSchemaException:
+                pass
+            else:
+                return
+        error = jsonschema.exceptions.best_match(
+            self._validator.iter_errors(data)
+        )
+        if error is not None:
+            raise error
 
 
-_SCHEMA = _read_schema()
+@lru_cache(maxsize=None)
+def _get_validator(name):
+    """Build a validator for a part of the lock file schema.
 
-_SOURCE_SCHEMA = next(
-    iter(_SCHEMA["properties"]["sources"]["patternProperties"].values())
-)
+    Validators are built once; `jsonschema.validate()` checks the schema and
+    creates a new validator on every call. Sub-schemas use the draft of the
+    top-level schema.
+    """
+    schema = _read_schema()
+    validator_class = jsonschema.validators.validator_for(schema)
+    return _Validator(validator_class, _select_schemas(schema)[name])
 
-_DEPENDENCY_SCHEMA = next(
-    iter(_SCHEMA["properties"]["dependencies"]["patternProperties"].values())
-)
 
-_PYTHONPACKAGE_SCHEMA = _DEPENDENCY_SCHEMA["properties"]["python"]
+def _view_validated(cls, data):
+    """Create a view over data that is already validated.
+
+    A view's data is validated as a whole when the view is created, so views
+    into its parts don't need to be checked again.
+    """
+    view = cls.__new__(cls)
+    view._data = data
+    return view
+
+
+class _ValidatedDataViewMapping(plette.models.DataViewMapping):
+    # Subclasses validate the whole mapping in one go, against the schema of
+    # the corresponding lock file section, instead of item by item.
+
+    def __getitem__(self, key):
+        return _view_validated(self.item_class, self._data[key])
 
 
 class Source(plette.models.DataView):
     @classmethod
     def validate(cls, data):
-        jsonschema.validate(instance=data, schema=_SOURCE_SCHEMA)
+        _get_validator("source").validate(data)
 
 
-class Sources(plette.models.DataViewMapping):
+class Sources(_ValidatedDataViewMapping):
     item_class = Source
 
+    @classmethod
+    def validate(cls, data):
+        _get_validator("sources").validate(data)
+
 
 @attr.s()
 class VersionSpec(object):
@@ -93,7 +184,7 @@ class VCSSpec(object):
 class PythonPackage(plette.models.DataView):
     @classmethod
     def validate(cls, data):
-        jsonschema.validate(instance=data, schema=_PYTHONPACKAGE_SCHEMA)
+        _get_validator("python").validate(data)
 
     def __eq__(self, other):
         if not isinstance(other, PythonPackage):
@@ -112,7 +203,7 @@ class PythonPackage(plette.models.DataView):
 
     @property
     def canonical_name(self):
-        return packaging.utils.canonicalize_name(self._data["name"])
+        return canonicalize_name(self._data["name"])
 
     @property
     def spec(self):
@@ -137,7 +228,7 @@ class PythonPackage(plette.models.DataView):
 class Dependency(plette.models.DataView):
     @classmethod
     def validate(cls, data):
-        jsonschema.validate(instance=data, schema=_DEPENDENCY_SCHEMA)
+        _get_validator("dependency").validate(data)
 
     @property
     def python(self):
@@ -145,16 +236,20 @@ class Dependency(plette.models.DataView):
             data = self._data["python"]
         except KeyError:
             return None
-        return PythonPackage(data)
+        return _view_validated(PythonPackage, data)
 
     @property
     def dependencies(self):
         return self._data.get("dependencies", [])
 
 
-class Dependencies(plette.models.DataViewMapping):
+class Dependencies(_ValidatedDataViewMapping):
     item_class = Dependency
 
+    @classmethod
+    def validate(cls, data):
+        _get_validator("dependencies").validate(data)
+
 
 class LockFile(plette.models.DataView):
     """A Molt format lock file.
@@ -175,15 +270,17 @@ class LockFile(plette.models.DataView):
 
     @classmethod
     def validate(cls, data):
-        jsonschema.validate(instance=data, schema=_SCHEMA)
+        _get_validator("lock").validate(data)
 
     @property
     def sources(self):
-        return Sources(self._data.get("sources", {}))
+        return _view_validated(Sources, self._data.get("sources", {}))
 
     @property
     def dependencies(self):
-        return Dependencies(self._data.get("dependencies", {}))
+        return _view_validated(
+            Dependencies, self._data.get("dependencies", {})
+        )
 
     @property
     def hashes(self):
@@ -197,10 +294,8 @@ class LockFile(plette.models.DataView):
         If `encoding` is set, `f` should be opened in binary mode. The lock
         file will be encoded in the specified encoding and written to `f`.
         """
-        encoder = _JSONEncoder()
+        content = _JSONEncoder().encode(self._data)
         if encoding is None:
-            for chunk in encoder.iterencode(self._data):
-                f.write(chunk)
+            f.write(content)
         else:
-            content = encoder.encode(self._data)
             f.write(content.encode(encoding))
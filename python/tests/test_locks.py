@@ -1,6 +1,7 @@
 import io
 import json
 import os
+import sys
 
 import jsonschema
 import pytest
@@ -19,6 +20,25 @@ def test_source_invalid():
         molt.locks.Source({})
 
 
+def test_source_fast_validation():
+    pytest.importorskip("fastjsonschema")
+    validator = molt.locks._get_validator("source")
+    assert validator._fast_validate is not None
+
+    molt.locks.Source({"url": "https://pypi.org/simple"})
+    with pytest.raises(jsonschema.ValidationError):
+        molt.locks.Source({})
+
+
+def test_sources():
+    molt.locks.Sources({"pypi": {"url": "https://pypi.org/simple"}})
+
+
+def test_sources_invalid():
+    with pytest.raises(jsonschema.ValidationError):
+        molt.locks.Sources({"pypi": {}})
+
+
 @pytest.mark.parametrize(
     "data",
     [
@@ -42,6 +62,50 @@ def test_python_package(data):
     molt.locks.PythonPackage(data)
 
 
+def test_python_package_eq():
+    package = molt.locks.PythonPackage({"name": "Foo_Bar", "version": "1.0"})
+    same = molt.locks.PythonPackage({"name": "foo-bar", "version": "1.0"})
+    assert package == same
+    assert not (package != same)
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        molt.locks.PythonPackage({"name": "foo-bar", "version": "2.0"}),
+        molt.locks.PythonPackage({"name": "foo-bar", "path": "./foo-bar"}),
+        molt.locks.PythonPackage({"name": "baz", "version": "1.0"}),
+        {"name": "foo-bar", "version": "1.0"},
+    ],
+)
+def test_python_package_ne(other):
+    package = molt.locks.PythonPackage({"name": "Foo_Bar", "version": "1.0"})
+    assert package != other
+    assert not (package == other)
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3,), reason="Python 2 falls back to identity hash"
+)
+def test_python_package_unhashable():
+    package = molt.locks.PythonPackage({"name": "pip", "version": "19.1"})
+    with pytest.raises(TypeError):
+        hash(package)
+
+
+def test_python_package_reflects_modification():
+    package = molt.locks.PythonPackage({"name": "Pip", "version": "19.1"})
+    other = molt.locks.PythonPackage({"name": "pip", "version": "20.0"})
+    assert package.spec == molt.locks.VersionSpec(version="19.1", source=None)
+    assert package != other
+
+    package["version"] = "20.0"
+    package["name"] = "PIP"
+    assert package.canonical_name == "pip"
+    assert package.spec == molt.locks.VersionSpec(version="20.0", source=None)
+    assert package == other
+
+
 @pytest.mark.parametrize(
     "data",
     [
@@ -63,3 +127,20 @@ def test_validate_sample_lock_files(example_name):
     lock_path = os.path.join(SAMPLES_ROOT, example_name, "molt.lock.json")
     with io.open(lock_path, encoding="utf-8") as f:
         molt.locks.LockFile.validate(json.load(f))
+
+
+@pytest.mark.parametrize("example_name", ["pipenv", "poetry", "virtenv"])
+def test_dump_sample_lock_files(example_name):
+    lock_path = os.path.join(SAMPLES_ROOT, example_name, "molt.lock.json")
+    with io.open(lock_path, encoding="utf-8") as f:
+        data = json.load(f)
+    lock = molt.locks.LockFile(data)
+
+    text_f = io.StringIO()
+    lock.dump(text_f)
+    assert json.loads(text_f.getvalue()) == data
+    assert text_f.getvalue().endswith("}\n")
+
+    binary_f = io.BytesIO()
+    lock.dump(binary_f, encoding="utf-8")
+    assert binary_f.getvalue().decode("utf-8") == text_f.getvalue()
@@ -68,3 +68,51 @@ def test_is_accounted_for(example_name):
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", category=PipfileLockWarning)
         assert molt.foreign.pipfile_lock.is_accounted_for(pipfile_lock, lock)
+
+
+def _make_pipfile_lock(default, develop):
+    return plette.Lockfile(
+        {
+            "_meta": {
+                "hash": {"sha256": "0" * 64},
+                "pipfile-spec": 6,
+                "requires": {},
+                "sources": [
+                    {
+                        "name": "pypi",
+                        "url": "https://pypi.org/simple",
+                        "verify_ssl": True,
+                    },
+                ],
+            },
+            "default": default,
+            "develop": develop,
+        }
+    )
+
+
+def test_to_lock_file_duplicate_keys():
+    pipfile_lock = _make_pipfile_lock(
+        default={
+            "Foo_Bar": {"version": "==1.0"},
+            "foo-bar": {"version": "==2.0"},
+            "baz": {"version": "==1.0"},
+        },
+        develop={"baz": {"version": "==2.0"}},
+    )
+    lock = molt.foreign.pipfile_lock.to_lock_file(pipfile_lock)
+
+    # The last entry in a section wins, and default wins over develop.
+    dependencies = lock._data["dependencies"]
+    assert dependencies["foo-bar"]["python"]["version"] == "2.0"
+    assert dependencies["baz"]["python"]["version"] == "1.0"
+
+
+def test_to_lock_file_string_package():
+    pipfile_lock = _make_pipfile_lock(default={"foo": "==1.0"}, develop={})
+    lock = molt.foreign.pipfile_lock.to_lock_file(pipfile_lock)
+
+    dependencies = lock._data["dependencies"]
+    assert dependencies["foo"] == {"python": {"name": "foo", "version": "1.0"}}
+    assert dependencies[""] == {"dependencies": {"foo": None}}
+    assert "foo" not in lock._data["hashes"]
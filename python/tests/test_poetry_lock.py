@@ -1,5 +1,6 @@
 import pytest
 
+import copy
 import io
 import json
 import os
@@ -22,6 +23,34 @@ def test_to_lock_file(example_name,):
         assert lock._data == json.load(f)
 
 
+@pytest.mark.parametrize("example_name", ["poetry"])
+def test_load_tomlkit_fallback(monkeypatch, example_name):
+    if molt.foreign.poetry_lock.tomllib is None:
+        pytest.skip("no TOML parser other than TOMLKit available")
+    tomlkit = pytest.importorskip("tomlkit")
+
+    poetry_lock_path = os.path.join(SAMPLES_ROOT, example_name, "poetry.lock")
+    with io.open(poetry_lock_path, encoding="utf-8") as f:
+        expected = molt.foreign.poetry_lock.load(f)
+
+    monkeypatch.setattr(molt.foreign.poetry_lock, "tomllib", None)
+    monkeypatch.setattr(
+        molt.foreign.poetry_lock, "tomlkit", tomlkit, raising=False
+    )
+    with io.open(poetry_lock_path, encoding="utf-8") as f:
+        poetry_lock = molt.foreign.poetry_lock.load(f)
+
+    assert poetry_lock == expected
+    # Compare serialized forms too, since True == 1 and False == 0.
+    assert json.dumps(poetry_lock, sort_keys=True) == json.dumps(
+        expected, sort_keys=True
+    )
+    assert (
+        molt.foreign.poetry_lock.to_lock_file(poetry_lock)._data
+        == molt.foreign.poetry_lock.to_lock_file(expected)._data
+    )
+
+
 @pytest.mark.parametrize("example_name", ["poetry"])
 def test_is_accounted_for(example_name):
     example_path = os.path.join(SAMPLES_ROOT, example_name)
@@ -35,3 +64,47 @@ def test_is_accounted_for(example_name):
         lock = molt.locks.LockFile.load(f)
 
     assert molt.foreign.poetry_lock.is_accounted_for(poetry_lock, lock)
+
+
+def _legacy_source_poetry_lock():
+    return {
+        "package": [
+            {
+                "name": "Foo_Bar",
+                "version": "1.0",
+                "category": "main",
+                "source": {
+                    "type": "legacy",
+                    "reference": "private",
+                    "url": "https://pypi.example.com/simple",
+                },
+            },
+        ],
+        "metadata": {"hashes": {"Foo_Bar": ["abcdef"]}},
+    }
+
+
+def test_is_accounted_for_legacy_source():
+    poetry_lock = _legacy_source_poetry_lock()
+    lock = molt.foreign.poetry_lock.to_lock_file(poetry_lock)
+    assert molt.foreign.poetry_lock.is_accounted_for(poetry_lock, lock)
+
+
+def test_is_accounted_for_legacy_source_url_mismatch():
+    poetry_lock = _legacy_source_poetry_lock()
+    data = copy.deepcopy(
+        molt.foreign.poetry_lock.to_lock_file(poetry_lock)._data,
+    )
+    data["sources"]["private"]["url"] = "https://other.example.com/simple"
+    lock = molt.locks.LockFile(data)
+    assert not molt.foreign.poetry_lock.is_accounted_for(poetry_lock, lock)
+
+
+def test_is_accounted_for_legacy_source_missing_hashes():
+    poetry_lock = _legacy_source_poetry_lock()
+    data = copy.deepcopy(
+        molt.foreign.poetry_lock.to_lock_file(poetry_lock)._data,
+    )
+    del data["hashes"]["foo-bar"]
+    lock = molt.locks.LockFile(data)
+    assert not molt.foreign.poetry_lock.is_accounted_for(poetry_lock, lock)